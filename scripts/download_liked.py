@@ -1,18 +1,21 @@
 """Script to download liked TikTok videos."""
 
+import asyncio
 from pathlib import Path
 import argparse
 
-from scripts.download_videos import download_videos
+from scripts.download_videos import download_videos_async
 
 def main():
     """Main entry point for downloading liked videos."""
     parser = argparse.ArgumentParser(description="Download TikTok liked videos from JSON file")
     parser.add_argument("liked_file", type=Path, help="Path to the liked videos JSON file")
     parser.add_argument("--limit", type=int, help="Limit the number of videos to download (for testing)")
+    parser.add_argument("--metadata-only", action="store_true",
+                      help="Only record metadata and download thumbnails, not the videos")
     
     args = parser.parse_args()
-    download_videos(args.liked_file, "liked", args.limit)
+    asyncio.run(download_videos_async(args.liked_file, "liked", args.limit, args.metadata_only))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
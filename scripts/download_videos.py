@@ -1,8 +1,10 @@
 """Script to download TikTok videos from data export."""
 
+import asyncio
+import os
 from pathlib import Path
 import argparse
-from typing import Literal
+from typing import Literal, Set, Tuple
 
 from src.downloader.video_downloader import TikTokDownloader
 from src.utils.logger import logger
@@ -10,30 +12,71 @@ from src.utils.config import (
     LIKED_VIDEOS_DIR,
     FAVORITE_VIDEOS_DIR,
     LIKED_VIDEO_METADATA,
-    FAVORITE_VIDEO_METADATA
+    FAVORITE_VIDEO_METADATA,
+    VIDEO_FORMAT
 )
 
-def download_videos(data_file: Path, video_type: Literal["liked", "favorite"], limit: int = None) -> None:
+def _output_paths(video_type: Literal["liked", "favorite"]) -> Tuple[Path, Path]:
+    """Get the output directory and metadata file for a video type."""
+    # Always use separate directories and metadata files based on type
+    if video_type == "liked":
+        return LIKED_VIDEOS_DIR, LIKED_VIDEO_METADATA
+    return FAVORITE_VIDEOS_DIR, FAVORITE_VIDEO_METADATA
+
+def _existing_video_ids(output_dir: Path) -> Set[str]:
+    """Get IDs of videos already present in the output directory."""
+    if not output_dir.exists():
+        return set()
+    suffix = f".{VIDEO_FORMAT}"
+    with os.scandir(output_dir) as entries:
+        return {
+            entry.name[:-len(suffix)]
+            for entry in entries
+            if entry.name.endswith(suffix) and entry.is_file()
+        }
+
+def download_videos(data_file: Path, video_type: Literal["liked", "favorite"], limit: int = None,
+                    metadata_only: bool = False) -> None:
     """Download videos from TikTok data export file."""
     if not data_file.exists():
         raise FileNotFoundError(f"Data file not found: {data_file}")
     
-    # Always use separate directories and metadata files based on type
-    if video_type == "liked":
-        output_dir = LIKED_VIDEOS_DIR
-        metadata_file = LIKED_VIDEO_METADATA
-    else:  # favorite
-        output_dir = FAVORITE_VIDEOS_DIR
-        metadata_file = FAVORITE_VIDEO_METADATA
+    output_dir, metadata_file = _output_paths(video_type)
     
     # Initialize downloader with explicit metadata file
     downloader = TikTokDownloader(output_dir=output_dir, metadata_file=metadata_file)
     
     try:
+        if metadata_only:
+            asyncio.run(downloader.process_metadata_only(data_file, video_type, limit))
+            return
         # Process videos using the unified method but with separate metadata
-        downloader.process_videos(data_file, video_type, limit)
+        downloader.process_videos(data_file, video_type, limit, skip=_existing_video_ids(output_dir))
     except Exception as e:
         logger.error(f"Failed to process {video_type} videos: {e}")
+    finally:
+        downloader.close()
+
+async def download_videos_async(data_file: Path, video_type: Literal["liked", "favorite"], limit: int = None,
+                                metadata_only: bool = False) -> None:
+    """Download videos from TikTok data export file with concurrent workers."""
+    if not data_file.exists():
+        raise FileNotFoundError(f"Data file not found: {data_file}")
+    
+    output_dir, metadata_file = _output_paths(video_type)
+    downloader = TikTokDownloader(output_dir=output_dir, metadata_file=metadata_file)
+    
+    try:
+        if metadata_only:
+            try:
+                await downloader.process_metadata_only(data_file, video_type, limit)
+            except Exception as e:
+                logger.error(f"Failed to process {video_type} videos: {e}")
+            return
+        
+        await downloader.process_videos_async(data_file, video_type, limit, skip=_existing_video_ids(output_dir))
+    finally:
+        downloader.close()
 
 def main():
     """Main entry point for downloading videos."""
@@ -42,9 +85,11 @@ def main():
     parser.add_argument("--type", type=str, choices=["liked", "favorite"], required=True,
                       help="Type of videos to download (liked or favorite)")
     parser.add_argument("--limit", type=int, help="Limit the number of videos to download (for testing)")
+    parser.add_argument("--metadata-only", action="store_true",
+                      help="Only record metadata and download thumbnails, not the videos")
     
     args = parser.parse_args()
-    download_videos(args.data_file, args.type, args.limit)
+    asyncio.run(download_videos_async(args.data_file, args.type, args.limit, args.metadata_only))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,20 +1,37 @@
 """Script to organize downloaded videos into their respective collection folders."""
 
-import json
+import errno
+import logging
+import os
+import re
 import shutil
+import string
 from pathlib import Path
 from typing import Dict, Set
 
 from src.utils.logger import logger
+from src.utils.config import COLLECTIONS_DATA, COLLECTIONS_DIR, UNCATEGORIZED_DIR, ensure_dir, ensure_dirs
+from src.utils import _json
+
+# Anything str.isalnum() rejects, other than space, hyphen and underscore
+_UNSAFE_CHARS_RE = re.compile(r'[^\w \-]')
+_SAFE_ASCII = frozenset(string.ascii_letters + string.digits + " -_")
+_ASCII_SANITIZE_TABLE = str.maketrans({chr(c): '_' for c in range(128) if chr(c) not in _SAFE_ASCII})
+
+def sanitize_collection_name(name: str) -> str:
+    """Replace characters that are unsafe in a directory name with underscores."""
+    if name.isascii():
+        return name.translate(_ASCII_SANITIZE_TABLE)
+    # Keep non-ASCII letters and digits, as str.isalnum() does
+    return _UNSAFE_CHARS_RE.sub('_', name)
 
 def load_collection_data() -> Dict[str, str]:
     """Load the collection data and return a mapping of video_id to collection_name."""
-    collection_file = Path("data/collection_videos.json")
+    collection_file = COLLECTIONS_DATA
     if not collection_file.exists():
         raise FileNotFoundError("Collection data file not found")
     
-    with open(collection_file, 'r', encoding='utf-8') as f:
-        collection_data = json.load(f)
+    collection_data = _json.load_from(collection_file)
     
     # Create video_id to collection_name mapping
     return {video_id: data['collection_name'] 
@@ -22,22 +39,38 @@ def load_collection_data() -> Dict[str, str]:
 
 def setup_collection_dirs(collection_names: Set[str]) -> Dict[str, Path]:
     """Create collection directories if they don't exist."""
-    collections_dir = Path("downloads/collections")
-    collections_dir.mkdir(exist_ok=True)
+    # Sibling of the uncategorized dir so moves stay on one filesystem
+    collections_dir = ensure_dir(COLLECTIONS_DIR)
+    
+    # One directory scan instead of a mkdir per collection
+    with os.scandir(collections_dir) as entries:
+        existing = {entry.name for entry in entries if entry.is_dir()}
     
     collection_paths = {}
     for name in collection_names:
         # Sanitize collection name for use as directory name
-        safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' 
-                           for c in name)
+        safe_name = sanitize_collection_name(name)
         collection_dir = collections_dir / safe_name
-        collection_dir.mkdir(exist_ok=True)
+        if safe_name not in existing:
+            ensure_dir(collection_dir)
+            existing.add(safe_name)
         collection_paths[name] = collection_dir
     
     return collection_paths
 
+def move_file(source: str, target: str) -> None:
+    """Move a file over any existing target, renaming in place unless it is on another filesystem."""
+    try:
+        os.replace(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, target)
+
 def organize_videos():
     """Organize downloaded videos into their respective collection folders."""
+    ensure_dirs()
+    
     # Load collection data
     try:
         video_collections = load_collection_data()
@@ -49,7 +82,7 @@ def organize_videos():
     collection_paths = setup_collection_dirs(set(video_collections.values()))
     
     # Setup uncategorized directory
-    uncategorized_dir = Path("downloads/uncategorized")
+    uncategorized_dir = UNCATEGORIZED_DIR
     if not uncategorized_dir.exists():
         logger.error("Uncategorized directory not found")
         return
@@ -58,22 +91,24 @@ def organize_videos():
     moved_to_collections = 0
     moved_to_uncategorized = 0
     
-    # Process each video file
-    for video_file in uncategorized_dir.glob("*.mp4"):
-        video_id = video_file.stem
-        
-        # Check if video belongs to a collection
-        if video_id in video_collections:
-            collection_name = video_collections[video_id]
-            target_dir = collection_paths[collection_name]
-            
-            # Move to collection
-            try:
-                shutil.move(str(video_file), str(target_dir / video_file.name))
-                moved_to_collections += 1
-                logger.info(f"Moved {video_file.name} to collection '{collection_name}'")
-            except Exception as e:
-                logger.error(f"Failed to move {video_file.name}: {e}")
+    # Find videos that belong to a collection in a single directory scan
+    with os.scandir(uncategorized_dir) as entries:
+        moves = [
+            (entry, video_collections[entry.name[:-4]])
+            for entry in entries
+            if entry.name.endswith(".mp4") and entry.is_file() and entry.name[:-4] in video_collections
+        ]
+    
+    # Move each video to its collection
+    debug = logger.isEnabledFor(logging.DEBUG)
+    for entry, collection_name in moves:
+        try:
+            move_file(entry.path, os.path.join(collection_paths[collection_name], entry.name))
+            moved_to_collections += 1
+            if debug:
+                logger.debug("Moved %s to collection '%s'", entry.name, collection_name)
+        except Exception as e:
+            logger.error(f"Failed to move {entry.name}: {e}")
     
     logger.info("Organization complete:")
     logger.info(f"- {moved_to_collections} videos moved to collections")
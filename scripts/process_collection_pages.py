@@ -1,22 +1,28 @@
 """Script to download and process TikTok collection pages."""
 
-import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import argparse
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
-from bs4 import BeautifulSoup
+from typing import Dict, List, Optional, Union
+from dataclasses import dataclass
+from selectolax.lexbor import LexborHTMLParser
 import logging
 
 from src.utils.logger import logger
-from src.utils.config import COLLECTIONS_DATA
+from src.utils.config import COLLECTIONS_DATA, ensure_dir, ensure_dirs
+from src.utils import _json
 from src.collections.html_parser import VideoMetadata
 
 # Set logging level to DEBUG
 logger.setLevel(logging.DEBUG)
 
-@dataclass
+_VIDEO_ID_RE = re.compile(r'/video/(\d+)')
+_CREATOR_ID_RE = re.compile(r'/@([^?]+)')
+_SANITIZE_RE = re.compile(r'[<>:"/\\|?*]')
+
+@dataclass(slots=True)
 class CollectionVideo:
     """Represents a video in a collection with its metadata."""
     video_id: str
@@ -30,14 +36,13 @@ class CollectionVideo:
 def sanitize_filename(name: str) -> str:
     """Convert a collection name to a valid filename."""
     # Replace invalid filename characters with underscores
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', name)
+    sanitized = _SANITIZE_RE.sub('_', name)
     return f"{sanitized}.html"
 
 def save_collection_page(collection_name: str, html_content: str) -> Path:
     """Save collection page HTML to a file."""
     # Create the collection pages directory if it doesn't exist
-    output_dir = Path("data/collection_pages")
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = ensure_dir(Path("data/collection_pages"))
     
     # Create sanitized filename
     filename = sanitize_filename(collection_name)
@@ -50,52 +55,60 @@ def save_collection_page(collection_name: str, html_content: str) -> Path:
     logger.info(f"Saved collection page for '{collection_name}' to {output_path}")
     return output_path
 
-def parse_collection_page(html_content: str, collection_name: str) -> List[CollectionVideo]:
-    """Parse videos and their metadata from a collection page."""
+def parse_collection_page(html_content: Union[str, bytes], collection_name: str) -> List[CollectionVideo]:
+    """Parse videos and their metadata from a collection page.
+
+    Raw bytes are decoded by the parser itself, so callers can skip decoding the file.
+    """
     videos: List[CollectionVideo] = []
-    soup = BeautifulSoup(html_content, 'html.parser')
+    tree = LexborHTMLParser(html_content)
     
     # Find all video items in the collection
     logger.debug(f"Parsing collection page: {collection_name}")
-    video_items = soup.find_all('div', {'data-e2e': 'collection-item'})
+    video_items = tree.css('div[data-e2e="collection-item"]')
     logger.debug(f"Found {len(video_items)} video items in {collection_name}")
+    # Per-item messages format lazily; the item HTML dump is only built when emitted
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     for item in video_items:
         try:
             # Get video link and ID
-            video_link = item.find('a', class_='css-1mdo0pl-AVideoContainer')
-            if not video_link or not video_link.get('href'):
-                logger.debug(f"No video link found in item: {item}")
+            video_link = item.css_first('a.css-1mdo0pl-AVideoContainer')
+            video_url = video_link.attributes.get('href') if video_link else None
+            if not video_url:
+                if debug:
+                    logger.debug("No video link found in item: %s", item.html)
                 continue
             
-            video_url = video_link['href']
             if not video_url.startswith('http'):
                 video_url = f"https://www.tiktok.com{video_url}"
             
-            video_id_match = re.search(r'/video/(\d+)', video_url)
+            video_id_match = _VIDEO_ID_RE.search(video_url)
             if not video_id_match:
-                logger.debug(f"Could not extract video ID from URL: {video_url}")
+                logger.debug("Could not extract video ID from URL: %s", video_url)
                 continue
             
             video_id = video_id_match.group(1)
-            logger.debug(f"Found video ID: {video_id}")
+            logger.debug("Found video ID: %s", video_id)
             
             # Get creator info
-            creator_elem = item.find('p', {'data-e2e': 'collection-item-username'})
-            creator = creator_elem.text if creator_elem else "unknown"
+            creator_elem = item.css_first('p[data-e2e="collection-item-username"]')
+            creator = creator_elem.text() if creator_elem else "unknown"
             
             # Get creator ID from their profile link
-            creator_link = item.find('a', {'data-e2e': 'collection-item-avatar'})
+            creator_link = item.css_first('a[data-e2e="collection-item-avatar"]')
+            creator_href = creator_link.attributes.get('href') if creator_link else None
             creator_id = "unknown"
-            if creator_link and creator_link.get('href'):
-                creator_id_match = re.search(r'/@([^?]+)', creator_link['href'])
+            if creator_href:
+                creator_id_match = _CREATOR_ID_RE.search(creator_href)
                 if creator_id_match:
                     creator_id = creator_id_match.group(1)
             
             # Get video description and thumbnail
-            img = item.find('img', {'alt': True})
-            description = img['alt'] if img and img.get('alt') else ""
-            thumbnail_url = img['src'] if img and img.get('src') else ""
+            img = item.css_first('img[alt]')
+            img_attrs = img.attributes if img else {}
+            description = img_attrs.get('alt') or ""
+            thumbnail_url = img_attrs.get('src') or ""
             
             # Create video object
             video = CollectionVideo(
@@ -108,10 +121,10 @@ def parse_collection_page(html_content: str, collection_name: str) -> List[Colle
                 collection_name=collection_name
             )
             videos.append(video)
-            logger.debug(f"Successfully parsed video {video_id} by {creator}")
+            logger.debug("Successfully parsed video %s by %s", video_id, creator)
             
         except Exception as e:
-            logger.error(f"Failed to parse video in collection '{collection_name}': {e}")
+            logger.error("Failed to parse video in collection '%s': %s", collection_name, e)
             continue
     
     return videos
@@ -123,15 +136,18 @@ def process_collection_page(html_file: Path) -> List[CollectionVideo]:
         collection_name = html_file.stem
         logger.debug(f"Processing collection page: {collection_name}")
         
-        # Read HTML content
+        # Read raw HTML bytes; Lexbor decodes them in C
         try:
-            with open(html_file, 'r', encoding='utf-8') as f:
+            if os.path.getsize(html_file) == 0:
+                logger.error(f"Empty HTML content in file {html_file}")
+                return []
+            with open(html_file, 'rb') as f:
                 html_content = f.read()
         except Exception as e:
             logger.error(f"Failed to read HTML file {html_file}: {str(e)}")
             return []
             
-        if not html_content.strip():
+        if html_content.isspace():
             logger.error(f"Empty HTML content in file {html_file}")
             return []
             
@@ -148,20 +164,20 @@ def process_collection_page(html_file: Path) -> List[CollectionVideo]:
         logger.error(f"Failed to process collection page {html_file}: {str(e)}")
         return []
 
-def save_video_metadata(videos: List[CollectionVideo], output_file: Optional[Path] = None) -> None:
-    """Save video metadata to a JSON file."""
+def save_video_metadata(videos: Dict[str, CollectionVideo], output_file: Optional[Path] = None) -> None:
+    """Save video metadata to a JSON file keyed by video ID.
+
+    Records are streamed one per line so the full document is never held in memory.
+    """
     if output_file is None:
-        output_file = Path("data/collection_videos.json")
-    
-    # Convert to dictionary format
-    video_data = {
-        video.video_id: asdict(video)
-        for video in videos
-    }
+        output_file = COLLECTIONS_DATA
     
-    # Save to file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(video_data, f, indent=2, ensure_ascii=False)
+    with open(output_file, 'wb') as f:
+        f.write(b'{')
+        for i, (video_id, video) in enumerate(videos.items()):
+            f.write(b',\n  ' if i else b'\n  ')
+            f.write(_json.dumps(video_id) + b': ' + _json.dumps(video))
+        f.write(b'\n}\n' if videos else b'}\n')
     
     logger.info(f"Saved metadata for {len(videos)} videos to {output_file}")
 
@@ -173,6 +189,7 @@ def main():
     parser.add_argument('--input-file', type=Path,
                       help='Single HTML file to process')
     args = parser.parse_args()
+    ensure_dirs()
     
     try:
         # Process single file or directory
@@ -193,24 +210,23 @@ def main():
             
         logger.info(f"Found {len(html_files)} collection pages to process")
         
-        # Process each HTML file
-        all_videos = []
-        for html_file in html_files:
-            try:
-                videos = process_collection_page(html_file)
-                all_videos.extend(videos)
-            except Exception as e:
-                logger.error(f"Failed to process {html_file}: {str(e)}")
-                continue
-            
-        if not all_videos:
+        # Parse HTML files in parallel; results are collected and saved by this process only
+        # Videos saved in more than one collection keep their first collection
+        videos_by_id: Dict[str, CollectionVideo] = {}
+        max_workers = min(os.cpu_count() or 1, len(html_files))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for videos in executor.map(process_collection_page, html_files, chunksize=4):
+                for video in videos:
+                    videos_by_id.setdefault(video.video_id, video)
+            
+        if not videos_by_id:
             logger.error("No videos found in any collection")
             return
             
         # Save video metadata to JSON
         output_file = COLLECTIONS_DATA
         try:
-            save_video_metadata(all_videos, output_file)
+            save_video_metadata(videos_by_id, output_file)
         except Exception as e:
             logger.error(f"Failed to save video metadata to {output_file}: {str(e)}")
             
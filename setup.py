@@ -6,8 +6,15 @@ setup(
     packages=find_packages(),
     install_requires=[
         "beautifulsoup4",
+        "lxml",
+        "selectolax",
         "requests",
         "selenium",
+        "aiohttp",
+        "aiofiles",
     ],
-    python_requires=">=3.6",
+    extras_require={
+        "speedups": ["orjson", "ijson"],  # fall back to ujson or the stdlib json module
+    },
+    python_requires=">=3.11",
 ) 
\ No newline at end of file
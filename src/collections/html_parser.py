@@ -1,10 +1,19 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, TypedDict
+from typing import Dict, List
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from selectolax.lexbor import LexborHTMLParser
 from ..utils.logger import logger
 
-class VideoMetadata(TypedDict):
+_VIDEO_ID_RE = re.compile(r'/video/(\d+)')
+
+# Only collection list items are inspected, so skip building the rest of the page
+_COLLECTION_LIST_STRAINER = SoupStrainer('div', attrs={'data-e2e': 'collection-list-item'})
+
+@dataclass(slots=True)
+class VideoMetadata:
+    """Video details parsed from a collection page."""
     video_id: str
     creator: str
     description: str
@@ -13,74 +22,71 @@ class VideoMetadata(TypedDict):
 def parse_collection_videos_html(html_content: str) -> List[VideoMetadata]:
     """
     Parse video IDs and metadata from a collection page HTML content.
-    Returns a list of video metadata dictionaries.
+    Returns a list of VideoMetadata records.
     """
     if not html_content.strip():
         logger.error("Empty HTML content provided")
         return []
         
     try:
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # Parse HTML with selectolax (Lexbor)
+        tree = LexborHTMLParser(html_content)
         
         # Find all video items
         videos: List[VideoMetadata] = []
-        video_items = soup.find_all('div', {'data-e2e': 'collection-item'})
+        video_items = tree.css('div[data-e2e="collection-item"]')
         
         if not video_items:
             logger.error("No video items found in HTML. Check if the page structure has changed.")
             return []
             
-        logger.info(f"Found {len(video_items)} video items to process")
+        total = len(video_items)
+        logger.info(f"Found {total} video items to process")
         
         for idx, item in enumerate(video_items, 1):
             try:
                 # Find the video link
-                video_link = item.find('a', class_='css-1mdo0pl-AVideoContainer')
-                if not video_link or not video_link.get('href'):
-                    logger.warning(f"Video {idx}: Found video without link, skipping...")
+                video_link = item.css_first('a.css-1mdo0pl-AVideoContainer')
+                video_url = video_link.attributes.get('href') if video_link else None
+                if not video_url:
+                    logger.warning("Video %d: Found video without link, skipping...", idx)
                     continue
                 
                 # Extract video ID from URL
-                video_url = video_link['href']
-                video_id_match = re.search(r'/video/(\d+)', video_url)
+                video_id_match = _VIDEO_ID_RE.search(video_url)
                 if not video_id_match:
-                    logger.warning(f"Video {idx}: Could not extract video ID from URL: {video_url}")
+                    logger.warning("Video %d: Could not extract video ID from URL: %s", idx, video_url)
                     continue
                 
                 video_id = video_id_match.group(1)
                 
                 # Get creator username
-                creator_elem = item.find('p', {'data-e2e': 'collection-item-username'})
-                creator = creator_elem.text if creator_elem else "unknown"
+                creator_elem = item.css_first('p[data-e2e="collection-item-username"]')
+                creator = creator_elem.text() if creator_elem else "unknown"
                 if creator == "unknown":
-                    logger.warning(f"Video {idx} ({video_id}): Could not find creator username")
+                    logger.warning("Video %d (%s): Could not find creator username", idx, video_id)
                 
                 # Get video description from aria-label and img alt
-                description_div = item.find('div', {'aria-label': True})
-                img = item.find('img', {'alt': True})
+                description_div = item.css_first('div[aria-label]')
+                img = item.css_first('img[alt]')
+                img_attrs = img.attributes if img else {}
                 
                 # Prefer aria-label description if available, fallback to img alt
-                description = description_div['aria-label'] if description_div else (img['alt'] if img and img.get('alt') else "")
+                description = (description_div.attributes.get('aria-label') or "") if description_div else (img_attrs.get('alt') or "")
                 if not description:
-                    logger.warning(f"Video {idx} ({video_id}): No description found")
+                    logger.warning("Video %d (%s): No description found", idx, video_id)
                 
                 # Get thumbnail URL
-                thumbnail_url = img['src'] if img and img.get('src') else ""
+                thumbnail_url = img_attrs.get('src') or ""
                 if not thumbnail_url:
-                    logger.warning(f"Video {idx} ({video_id}): No thumbnail URL found")
+                    logger.warning("Video %d (%s): No thumbnail URL found", idx, video_id)
                 
-                videos.append({
-                    'video_id': video_id,
-                    'creator': creator,
-                    'description': description,
-                    'thumbnail_url': thumbnail_url
-                })
+                videos.append(VideoMetadata(video_id, creator, description, thumbnail_url))
                 
-                logger.info(f"Successfully parsed video {idx}/{len(video_items)}: {video_id} by {creator}")
+                logger.info("Successfully parsed video %d/%d: %s by %s", idx, total, video_id, creator)
                 
             except Exception as e:
-                logger.error(f"Failed to parse video {idx}: {str(e)}")
+                logger.error("Failed to parse video %d: %s", idx, e)
                 continue
         
         logger.info(f"Successfully parsed {len(videos)}/{len(video_items)} videos")
@@ -100,7 +106,7 @@ def parse_collections_html(html_file: Path) -> Dict[str, str]:
             content = f.read()
         
         # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = BeautifulSoup(content, 'lxml', parse_only=_COLLECTION_LIST_STRAINER)
         
         # Find all collection containers
         collections: Dict[str, str] = {}
@@ -1,13 +1,33 @@
-import json
+import asyncio
+import atexit
+import functools
+import os
+import random
+import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any, Optional, Literal
+from typing import Deque, Dict, Any, Iterator, List, Optional, Literal, Set, Tuple
+from urllib.parse import urlparse
+import aiofiles
+import aiohttp
 import yt_dlp
+try:
+    import ijson  # picks the yajl2_c backend when it is available
+except ImportError:
+    ijson = None
+from ..utils import _json
 from ..utils.logger import (
     logger,
     load_download_history,
+    append_download_history,
     save_download_history,
     load_video_metadata,
+    append_video_metadata,
     save_video_metadata,
     YTDLLogger
 )
@@ -15,11 +35,84 @@ from ..utils.config import (
     DOWNLOADS_DIR,
     LIKED_VIDEO_METADATA,
     FAVORITE_VIDEO_METADATA,
-    check_disk_space
+    VIDEO_FORMAT,
+    MAX_RETRIES,
+    MIN_DELAY,
+    MAX_CONCURRENT_DOWNLOADS,
+    MAX_CONNECTIONS_PER_HOST,
+    METADATA_PREFETCH,
+    DOWNLOAD_CHUNK_SIZE,
+    SNAPSHOT_INTERVAL,
+    disk_usage,
+    release_disk_space,
+    reserve_disk_space,
+    ensure_dirs
 )
-from ..utils.rate_limiter import RateLimitHandler
+from ..utils.metadata_cache import MetadataCache
+from ..utils.rate_limiter import CONTENT_ERROR_RE, RateLimitHandler, TokenBucket
 from ..utils.session_manager import SessionManager
 
+# Numeric video ID in tiktok.com/@user/video/<id>, tiktokv.com/share/video/<id>/ and m.tiktok.com/v/<id>.html URLs
+_VIDEO_ID_RE = re.compile(r'(?:video/|tiktokv\.com/[^/]*/|/)(\d{15,25})(?:[/?.]|$)')
+# No limit on a whole streamed body, only on stalls, matching yt-dlp's socket_timeout
+_CLIENT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+
+class DownloadResult(Enum):
+    """Outcome of a single video download."""
+    OK = "ok"
+    FAIL = "fail"
+    DISK_FULL = "disk_full"  # MAX_DOWNLOADS_SIZE reached; no further downloads should start
+
+def _backoff(attempt: int, base: float = 1.0) -> float:
+    """Exponential backoff with jitter, so concurrent workers don't retry in lockstep."""
+    return base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+@functools.lru_cache(maxsize=100_000)
+def _extract_video_id(url: str) -> Optional[str]:
+    """Extract video ID from TikTok URL, caching the result per URL."""
+    match = _VIDEO_ID_RE.search(url)
+    if not match:
+        logger.error(f"Failed to extract video ID from {url}")
+        return None
+    return match.group(1)
+
+@functools.lru_cache(maxsize=100_000)
+def _convert_to_web_url(url: str) -> str:
+    """Convert tiktokv.com URL to regular tiktok.com URL format, caching the result per URL."""
+    if 'tiktokv.com' in url:
+        video_id = _extract_video_id(url)
+        return f"https://www.tiktok.com/@user/video/{video_id}"
+    return url
+
+def _iter_export_items(data_file: Path, json_path: List[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the items of the list at json_path in a TikTok data export.
+
+    With ijson the export is parsed incrementally, so only the current item is held
+    in memory; otherwise the whole file is loaded.
+    """
+    if ijson is not None:
+        with open(data_file, 'rb') as f:
+            found = False
+            for item in ijson.items(f, '.'.join(json_path) + '.item'):
+                found = True
+                yield item
+            if found:
+                return
+            # Nothing yielded: tell an empty list from a missing key, as the fallback does
+            f.seek(0)
+            keys = {f"{prefix}.{value}" if prefix else value
+                    for prefix, event, value in ijson.parse(f) if event == 'map_key'}
+        for depth, key in enumerate(json_path, 1):
+            if '.'.join(json_path[:depth]) not in keys:
+                raise KeyError(key)
+        return
+
+    current = _json.load_from(data_file)
+    # Navigate JSON path to get videos
+    for key in json_path:
+        current = current[key]
+    yield from current
+
 class TikTokDownloader:
     def __init__(self, output_dir: Path, metadata_file: Path):
         """Initialize TikTok video downloader.
@@ -28,11 +121,19 @@ class TikTokDownloader:
             output_dir: Directory to save downloaded videos
             metadata_file: File to store video metadata
         """
+        ensure_dirs()
         self.download_history = load_download_history()
         self.video_metadata = load_video_metadata(metadata_file)
+        self.output_dir = output_dir
         self.metadata_file = metadata_file
+        self._unsaved_downloads = 0
+        # Serializes history/metadata updates and log appends with snapshot writes
+        self._history_lock = threading.Lock()
+        atexit.register(self.save_snapshots)
         self.rate_limiter = RateLimitHandler()
         self.session_manager = SessionManager()
+        self.metadata_cache = MetadataCache()
+        self._buckets: Dict[str, TokenBucket] = {}
         
         # Configure yt-dlp options with reduced verbosity
         self.ydl_opts = {
@@ -48,82 +149,268 @@ class TikTokDownloader:
             **self.session_manager.get_yt_dlp_options()
         }
 
+        # Long-lived YoutubeDL instances keep their connection pool between videos.
+        # yt-dlp is not thread-safe, so each worker thread gets its own pair.
+        self._ydl_local = threading.local()
+        self._ydl_instances: List[yt_dlp.YoutubeDL] = []
+        self._ydl_lock = threading.Lock()
+
+    def _get_ydl(self, download: bool = False) -> yt_dlp.YoutubeDL:
+        """Get the calling thread's YoutubeDL instance for metadata extraction or downloads."""
+        attr = '_ydl_dl' if download else '_ydl_meta'
+        ydl = getattr(self._ydl_local, attr, None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL({**self.ydl_opts, 'extract_flat': not download})
+            ydl.params['http_headers']['User-Agent'] = self.session_manager.session_data['user_agent']
+            setattr(self._ydl_local, attr, ydl)
+            with self._ydl_lock:
+                self._ydl_instances.append(ydl)
+        return ydl
+
+    def _rotate_user_agent(self) -> None:
+        """Rotate the session user agent and apply it to the live YoutubeDL instances."""
+        self.session_manager.rotate_user_agent()
+        self.ydl_opts.update(self.session_manager.get_yt_dlp_options())
+        user_agent = self.session_manager.session_data['user_agent']
+        with self._ydl_lock:
+            for ydl in self._ydl_instances:
+                # Update in place so the request handlers and their connections survive
+                ydl.params['http_headers']['User-Agent'] = user_agent
+
+    def save_snapshots(self) -> None:
+        """Write full history and metadata snapshots if downloads were only appended to the logs."""
+        with self._history_lock:
+            if self._unsaved_downloads:
+                save_download_history(self.download_history)
+                save_video_metadata(self.video_metadata, self.metadata_file)
+                self._unsaved_downloads = 0
+
+    def close(self) -> None:
+        """Save pending snapshots and close the YoutubeDL instances, the session and the metadata cache."""
+        self.save_snapshots()
+        # The atexit hook no longer keeps this instance alive
+        atexit.unregister(self.save_snapshots)
+        self.session_manager.close()
+        with self._ydl_lock:
+            for ydl in self._ydl_instances:
+                ydl.close()
+            self._ydl_instances.clear()
+        self._ydl_local = threading.local()
+        self.metadata_cache.close()
+
     def _extract_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from TikTok URL."""
-        try:
-            # Handle tiktokv.com format
-            if 'tiktokv.com' in url:
-                return url.rstrip('/').split('/')[-1]
-            # Handle regular tiktok.com format
-            elif 'video/' in url:
-                return url.split('video/')[1].split('?')[0]
-            return url.split('/')[-1].split('?')[0]
-        except Exception as e:
-            logger.error(f"Failed to extract video ID from {url}: {e}")
-            return None
+        return _extract_video_id(url)
 
     def _convert_to_web_url(self, url: str) -> str:
         """Convert tiktokv.com URL to regular tiktok.com URL format."""
-        if 'tiktokv.com' in url:
-            video_id = self._extract_video_id(url)
-            return f"https://www.tiktok.com/@user/video/{video_id}"
-        return url
+        return _convert_to_web_url(url)
 
-    def _get_video_metadata(self, url: str) -> Optional[Dict[str, Any]]:
-        """Extract metadata from TikTok video."""
+    def _bucket_for(self, url: str) -> TokenBucket:
+        """Get the token bucket pacing requests to the URL's host."""
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(rate=1 / MIN_DELAY, capacity=MAX_CONCURRENT_DOWNLOADS)
+        return self._buckets[host]
+
+    def _extract_info(self, url: str) -> Optional[Dict[str, Any]]:
+        """Run yt-dlp extraction for a video and return the raw info dict."""
         attempts = 0
         max_attempts = 3
         last_error = None
 
         while attempts < max_attempts:
             try:
-                with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    filesize = info.get('filesize') or info.get('filesize_approx', 0)
-                    
-                    return {
-                        'id': info.get('id'),
-                        'title': info.get('title'),
-                        'description': info.get('description'),
-                        'uploader': info.get('uploader'),
-                        'uploader_id': info.get('uploader_id'),
-                        'timestamp': info.get('timestamp'),
-                        'duration': info.get('duration'),
-                        'view_count': info.get('view_count'),
-                        'like_count': info.get('like_count'),
-                        'comment_count': info.get('comment_count'),
-                        'repost_count': info.get('repost_count'),
-                        'tags': info.get('tags', []),
-                        'filesize': filesize,
-                    }
+                return self._get_ydl().extract_info(url, download=False)
             except Exception as e:
                 last_error = str(e)
                 attempts += 1
                 
                 if "Cookie" in last_error or "permission" in last_error.lower():
                     logger.warning("Cookie/permission error detected, updating session...")
-                    self.session_manager.rotate_user_agent()
-                    self.ydl_opts.update(self.session_manager.get_yt_dlp_options())
+                    self._rotate_user_agent()
                 
                 if attempts < max_attempts:
-                    delay = 2 ** attempts  # Exponential backoff
-                    logger.warning(f"Attempt {attempts}/{max_attempts} failed. Retrying in {delay}s... Error: {last_error}")
+                    delay = _backoff(attempts)
+                    logger.warning(f"Attempt {attempts}/{max_attempts} failed. Retrying in {delay:.1f}s... Error: {last_error}")
                     time.sleep(delay)
                 else:
                     logger.error(f"Failed to extract metadata after {max_attempts} attempts. Last error: {last_error}")
         
         return None
 
-    def download_video(self, url: str) -> bool:
-        """Download a single video and its metadata."""
+    async def _extract_info_async(self, url: str) -> Optional[Dict[str, Any]]:
+        """Run yt-dlp extraction in a worker thread, paced by the host's token bucket."""
+        await self._bucket_for(url).acquire()
+        return await asyncio.to_thread(self._extract_info, url)
+
+    @staticmethod
+    def _metadata_from_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the stored metadata record from a yt-dlp info dict."""
+        filesize = info.get('filesize') or info.get('filesize_approx', 0)
+        return {
+            'id': info.get('id'),
+            'title': info.get('title'),
+            'description': info.get('description'),
+            'uploader': info.get('uploader'),
+            'uploader_id': info.get('uploader_id'),
+            'timestamp': info.get('timestamp'),
+            'duration': info.get('duration'),
+            'view_count': info.get('view_count'),
+            'like_count': info.get('like_count'),
+            'comment_count': info.get('comment_count'),
+            'repost_count': info.get('repost_count'),
+            'tags': info.get('tags', []),
+            'filesize': filesize,
+        }
+
+    def _get_video_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        """Extract metadata from TikTok video, consulting the metadata cache first."""
+        video_id = self._extract_video_id(url)
+        metadata = self.metadata_cache.get(video_id) if video_id else None
+        if metadata:
+            return metadata
+
+        info = self._extract_info(url)
+        if not info:
+            return None
+        metadata = self._metadata_from_info(info)
+        if video_id:
+            self.metadata_cache.put(video_id, metadata)
+        return metadata
+
+    def _download_with_ytdlp(self, web_url: str, video_id: str) -> Tuple[bool, str]:
+        """Download a video through yt-dlp with retries.
+
+        Returns:
+            Tuple of (success, last error message)
+        """
+        error_msg = ""
+        max_download_attempts = 3
+        
+        for attempt in range(max_download_attempts):
+            try:
+                self._get_ydl(download=True).download([web_url])
+                return True, ""
+            except Exception as e:
+                error_msg = str(e)
+                if "NoneType" in error_msg or "unsupported operand" in error_msg:
+                    logger.warning(f"Skipping video {video_id} - non-standard content detected")
+                    # Don't retry for content-related errors
+                    break
+                if attempt < max_download_attempts - 1:
+                    delay = _backoff(attempt + 1)
+                    logger.warning(f"Download attempt {attempt + 1}/{max_download_attempts} failed. Retrying in {delay:.1f}s... Error: {error_msg}")
+                    
+                    if "Cookie" in error_msg or "permission" in error_msg.lower():
+                        self._rotate_user_agent()
+                    
+                    time.sleep(delay)
+
+        return False, error_msg
+
+    async def _download_body_async(self, session: aiohttp.ClientSession, media_url: str,
+                                   headers: Dict[str, str], path: Path) -> Tuple[bool, str]:
+        """Stream a media URL to disk, retrying 429/5xx responses with exponential backoff.
+
+        The body is written in fixed-size chunks to a ``.part`` file that is renamed into
+        place once complete, so memory per download stays bounded and partial files are
+        never mistaken for finished ones.
+
+        Returns:
+            Tuple of (success, last error message)
+        """
+        error_msg = ""
+        part_path = path.with_name(path.name + '.part')
+        for attempt in range(MAX_RETRIES):
+            bucket = self._bucket_for(media_url)
+            await bucket.acquire()
+            try:
+                async with session.get(media_url, headers=headers) as resp:
+                    bucket.update_from_headers(resp.headers)
+                    if resp.status == 429 or resp.status >= 500:
+                        error_msg = f"HTTP {resp.status}"
+                    elif resp.status >= 400:
+                        # Not retryable (e.g. 403 on an unsigned URL)
+                        return False, f"HTTP {resp.status}"
+                    else:
+                        try:
+                            # No per-chunk fsync, but one per file before the rename, so a crash
+                            # can't leave a truncated video under the final name
+                            async with aiofiles.open(part_path, 'wb') as f:
+                                async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                    await f.write(chunk)
+                                await f.flush()
+                                await asyncio.to_thread(os.fsync, f.fileno())
+                            if path.exists():
+                                disk_usage.remove(path.stat().st_size, path)
+                            part_path.replace(path)
+                        except BaseException:
+                            # Disk errors and cancellation must not leave the .part file behind
+                            part_path.unlink(missing_ok=True)
+                            raise
+                        disk_usage.add(path.stat().st_size, path)
+                        return True, ""
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error_msg = str(e) or type(e).__name__
+                part_path.unlink(missing_ok=True)
+
+            if attempt < MAX_RETRIES - 1:
+                delay = _backoff(attempt + 1)
+                logger.warning(f"Stream attempt {attempt + 1}/{MAX_RETRIES} failed. Retrying in {delay:.1f}s... Error: {error_msg}")
+                await asyncio.sleep(delay)
+
+        return False, error_msg
+
+    def _record_download(self, video_id: str, metadata: Dict[str, Any]) -> None:
+        """Persist history and metadata for a successfully downloaded video.
+
+        Does blocking file I/O, so the async path runs it in a worker thread.
+        """
+        with self._history_lock:
+            self.download_history.add(video_id)
+            self.video_metadata[video_id] = metadata
+
+            # Append to the logs; full snapshots are only written periodically
+            append_download_history(video_id)
+            append_video_metadata(video_id, metadata, self.metadata_file)
+            self._unsaved_downloads += 1
+            snapshot_due = self._unsaved_downloads >= SNAPSHOT_INTERVAL
+        if snapshot_due:
+            self.save_snapshots()
+
+        filesize = metadata.get('filesize', 0)
+        logger.info(f"Successfully downloaded video {video_id} (size: {filesize / 1024 / 1024:.2f} MB)")
+        
+        # If we've had several successes, try reducing delay
+        stats = self.rate_limiter.get_stats()
+        if stats['success_count'] % 10 == 0:
+            self._rotate_user_agent()
+
+    def _handle_download_error(self, video_id: str, url: str, error_msg: str) -> None:
+        """Log a failed download and report it to the rate limiter."""
+        # Check if this is a content-related error
+        if CONTENT_ERROR_RE.search(error_msg):
+            logger.warning(f"Skipping video {video_id} - content error: {error_msg}")
+        else:
+            logger.error(f"Failed to download {url}: {error_msg}")
+        self.rate_limiter.update(False, error_msg)
+
+    def download_video(self, url: str, metadata_future: Optional[Future] = None) -> DownloadResult:
+        """Download a single video and its metadata.
+        
+        Args:
+            url: Video URL from the data export
+            metadata_future: Optional prefetched result of _get_video_metadata for this video
+        """
         video_id = self._extract_video_id(url)
         if not video_id:
-            return False
+            return DownloadResult.FAIL
 
         # Skip if already downloaded
         if video_id in self.download_history:
             logger.info(f"Video {video_id} already downloaded, skipping...")
-            return True
+            return DownloadResult.OK
 
         try:
             # Convert URL to web format for yt-dlp
@@ -131,94 +418,122 @@ class TikTokDownloader:
             logger.info(f"Converting {url} to {web_url}")
 
             # Get metadata first
-            metadata = self._get_video_metadata(web_url)
+            if metadata_future is not None:
+                metadata = metadata_future.result()
+            else:
+                metadata = self._get_video_metadata(web_url)
             if not metadata:
                 # Update rate limiter with content error
                 self.rate_limiter.update(False, "NoneType metadata - likely slideshow or non-standard content")
                 logger.warning(f"Skipping video {video_id} - non-standard content (possibly slideshow)")
-                return False
+                return DownloadResult.FAIL
 
-            # Check if we have enough disk space
+            # Reserve disk space for the video until it has landed
             filesize = metadata.get('filesize', 0)
-            if not check_disk_space(filesize):
+            if not reserve_disk_space(filesize):
                 logger.error(f"Not enough disk space for video {video_id} (size: {filesize / 1024 / 1024:.2f} MB). Stopping downloads.")
-                return False
-
-            # Configure download options
-            download_opts = self.ydl_opts.copy()
-            download_opts['extract_flat'] = False
+                return DownloadResult.DISK_FULL
 
             # Download video with retries
-            success = False
-            error_msg = ""
-            max_download_attempts = 3
-            
-            for attempt in range(max_download_attempts):
-                try:
-                    with yt_dlp.YoutubeDL(download_opts) as ydl:
-                        ydl.download([web_url])
-                    success = True
-                    break
-                except Exception as e:
-                    error_msg = str(e)
-                    if "NoneType" in error_msg or "unsupported operand" in error_msg:
-                        logger.warning(f"Skipping video {video_id} - non-standard content detected")
-                        # Don't retry for content-related errors
-                        break
-                    if attempt < max_download_attempts - 1:
-                        delay = 2 ** (attempt + 1)  # Exponential backoff
-                        logger.warning(f"Download attempt {attempt + 1}/{max_download_attempts} failed. Retrying in {delay}s... Error: {error_msg}")
-                        
-                        if "Cookie" in error_msg or "permission" in error_msg.lower():
-                            self.session_manager.rotate_user_agent()
-                            download_opts.update(self.session_manager.get_yt_dlp_options())
-                        
-                        time.sleep(delay)
+            try:
+                success, error_msg = self._download_with_ytdlp(web_url, video_id)
+            finally:
+                release_disk_space(filesize)
 
             # Update rate limiter and get delay for next download
-            delay = self.rate_limiter.update(success, error_msg)
+            self.rate_limiter.update(success, error_msg)
             
             if success:
-                # Update history and metadata
-                self.download_history.add(video_id)
-                self.video_metadata[video_id] = metadata
-                
-                # Save to files
-                save_download_history(self.download_history)
-                save_video_metadata(self.video_metadata, self.metadata_file)
+                self._record_download(video_id, metadata)
+                return DownloadResult.OK
+            return DownloadResult.FAIL
 
-                logger.info(f"Successfully downloaded video {video_id} (size: {filesize / 1024 / 1024:.2f} MB)")
-                
-                # If we've had several successes, try reducing delay
-                stats = self.rate_limiter.get_stats()
-                if stats['success_count'] % 10 == 0:
-                    self.session_manager.rotate_user_agent()
-                    self.ydl_opts.update(self.session_manager.get_yt_dlp_options())
-                
-                return True
-            return False
+        except Exception as e:
+            self._handle_download_error(video_id, url, str(e))
+            return DownloadResult.FAIL
+
+    async def download_video_async(self, session: aiohttp.ClientSession, url: str) -> DownloadResult:
+        """Download a single video, streaming the body over a shared aiohttp session.
+
+        yt-dlp extraction runs in a worker thread. The media body is fetched with
+        aiohttp, falling back to a yt-dlp download when the direct fetch fails.
+        """
+        video_id = self._extract_video_id(url)
+        if not video_id:
+            return DownloadResult.FAIL
+
+        # Skip if already downloaded
+        if video_id in self.download_history:
+            logger.info(f"Video {video_id} already downloaded, skipping...")
+            return DownloadResult.OK
+
+        try:
+            web_url = self._convert_to_web_url(url)
+            info = await self._extract_info_async(web_url)
+            if not info:
+                self.rate_limiter.update(False, "NoneType metadata - likely slideshow or non-standard content")
+                logger.warning(f"Skipping video {video_id} - non-standard content (possibly slideshow)")
+                return DownloadResult.FAIL
+
+            metadata = self._metadata_from_info(info)
+            await asyncio.to_thread(self.metadata_cache.put, video_id, metadata)
+            filesize = metadata.get('filesize', 0)
+            if not reserve_disk_space(filesize):
+                logger.error(f"Not enough disk space for video {video_id} (size: {filesize / 1024 / 1024:.2f} MB). Stopping downloads.")
+                return DownloadResult.DISK_FULL
+
+            try:
+                success, error_msg = False, ""
+                media_url = info.get('url')
+                if media_url:
+                    path = self.output_dir / f"{info.get('id') or video_id}.{info.get('ext') or VIDEO_FORMAT}"
+                    success, error_msg = await self._download_body_async(
+                        session, media_url, info.get('http_headers') or {}, path
+                    )
+                if not success:
+                    # Direct fetch unavailable or rejected - let yt-dlp handle signing
+                    success, error_msg = await asyncio.to_thread(self._download_with_ytdlp, web_url, video_id)
+            finally:
+                release_disk_space(filesize)
+
+            self.rate_limiter.update(success, error_msg)
+            if success:
+                await asyncio.to_thread(self._record_download, video_id, metadata)
+                return DownloadResult.OK
+            return DownloadResult.FAIL
 
         except Exception as e:
-            error_msg = str(e)
-            # Check if this is a content-related error
-            content_errors = ['NoneType', 'unsupported operand', 'slideshow', 'index out of range']
-            if any(err in error_msg for err in content_errors):
-                logger.warning(f"Skipping video {video_id} - content error: {error_msg}")
-                self.rate_limiter.update(False, error_msg)
-                return False
-            
-            logger.error(f"Failed to download {url}: {error_msg}")
-            self.rate_limiter.update(False, error_msg)
-            return False
+            self._handle_download_error(video_id, url, str(e))
+            return DownloadResult.FAIL
 
-    def process_videos(self, data_file: Path, video_type: Literal["liked", "favorite"], limit: int = None):
-        """Process videos from the TikTok data export file.
+    def _pending(self, videos: Iterator[Dict[str, Any]], url_key: str, skip: Set[str],
+                 seen: Set[str]) -> Iterator[Tuple[str, str]]:
+        """Yield (video_id, url) for export items not yet downloaded or skipped.
+
+        Every distinct ID is added to seen, so callers can report the total. Repeated
+        IDs keep their first URL.
+        """
+        for video in videos:
+            url = video[url_key]
+            # Warms the per-URL cache used again when the video is downloaded
+            video_id = _extract_video_id(url)
+            if not video_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            if video_id not in self.download_history and video_id not in skip:
+                yield video_id, url
+
+    def get_pending_videos(self, data_file: Path, video_type: Literal["liked", "favorite"],
+                           limit: int = None, skip: Optional[Set[str]] = None) -> List[Tuple[str, str]]:
+        """Load the export file and return (video_id, url) pairs not yet downloaded.
         
         Args:
             data_file: Path to the TikTok data export JSON file
             video_type: Type of videos to process ("liked" or "favorite")
             limit: Optional limit on number of videos to process
+            skip: Optional video IDs to leave out, e.g. files already in the output directory
         """
+        skip = skip or set()
         type_config = {
             "liked": {
                 "json_path": ["Activity", "Like List", "ItemFavoriteList"],
@@ -230,73 +545,181 @@ class TikTokDownloader:
             }
         }[video_type]
 
+        videos = _iter_export_items(data_file, type_config["json_path"])
+        if limit:
+            videos = islice(videos, limit)
+            logger.info(f"Testing with {limit} videos")
+
+        # Extract IDs and filter out already downloaded ones in a single pass
+        seen: Set[str] = set()
+        pending = list(self._pending(videos, type_config["url_key"], skip, seen))
+
+        if pending:
+            logger.info(f"Found {len(seen)} total videos")
+            logger.info(f"Skipping {len(seen) - len(pending)} already downloaded videos")
+            logger.info(f"Downloading {len(pending)} new videos")
+        return pending
+
+    async def _download_worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue, total: int) -> None:
+        """Download queued videos until the queue is empty."""
+        while True:
+            try:
+                i, (video_id, url) = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self.rate_limiter.acquire()
+                logger.info(f"Processing new video {i}/{total}: {url}")
+                if await self.download_video_async(session, url) is DownloadResult.DISK_FULL:
+                    # Drop the remaining videos so every worker stops
+                    while not queue.empty():
+                        queue.get_nowait()
+                    logger.info("Stopping downloads due to disk space limit")
+                    return
+            except Exception as e:
+                logger.error(f"Error processing video {video_id}: {e}")
+
+    async def process_videos_async(self, data_file: Path, video_type: Literal["liked", "favorite"],
+                                   limit: int = None, skip: Optional[Set[str]] = None) -> None:
+        """Process videos from the TikTok data export file with concurrent workers.
+        
+        Workers share one aiohttp session, so metadata extraction for one video overlaps
+        with body downloads of others while per-host connections stay capped.
+        
+        Args:
+            data_file: Path to the TikTok data export JSON file
+            video_type: Type of videos to process ("liked" or "favorite")
+            limit: Optional limit on number of videos to process
+            skip: Optional video IDs to leave out without any network request
+        """
         try:
-            # Open file with UTF-8 encoding
-            with open(data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Navigate JSON path to get videos
-            current = data
-            for key in type_config["json_path"]:
-                current = current[key]
-            videos = current
-
-            if limit:
-                videos = videos[:limit]
-                logger.info(f"Testing with {limit} videos")
-
-            # Pre-process all video IDs and filter out already downloaded ones
-            video_map = {}
-            for video in videos:
-                url = video[type_config["url_key"]]
-                video_id = self._extract_video_id(url)
-                if video_id:
-                    video_map[video_id] = video
-
-            # Get list of videos to download (exclude already downloaded ones)
-            videos_to_download = {
-                vid_id: video 
-                for vid_id, video in video_map.items() 
-                if vid_id not in self.download_history
-            }
+            # Parsing the export and sizing the downloads directory both block
+            pending = await asyncio.to_thread(self.get_pending_videos, data_file, video_type, limit, skip)
+        except Exception as e:
+            logger.error(f"Failed to process {video_type} videos: {e}")
+            return
+
+        total = len(pending)
+        if total == 0:
+            logger.info("No new videos to download")
+            return
+        await asyncio.to_thread(lambda: disk_usage.total)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(pending, 1):
+            queue.put_nowait(item)
+
+        connector = aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST, keepalive_timeout=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=_CLIENT_TIMEOUT) as session:
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(min(MAX_CONCURRENT_DOWNLOADS, total)):
+                    workers.create_task(self._download_worker(session, queue, total))
+
+        self.log_session_stats()
+
+    async def process_metadata_only(self, data_file: Path, video_type: Literal["liked", "favorite"],
+                                    limit: int = None) -> None:
+        """Record metadata and fetch thumbnails without downloading the videos.
+        
+        Args:
+            data_file: Path to the TikTok data export JSON file
+            video_type: Type of videos to process ("liked" or "favorite")
+            limit: Optional limit on number of videos to process
+        """
+        pending = await asyncio.to_thread(
+            self.get_pending_videos, data_file, video_type, limit, set(self.video_metadata)
+        )
+        if not pending:
+            logger.info("No new videos to fetch metadata for")
+            return
+        await asyncio.to_thread(lambda: disk_usage.total)
+
+        recorded = 0
+        connector = aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=_CLIENT_TIMEOUT) as session:
+                for i, (video_id, url) in enumerate(pending, 1):
+                    logger.info(f"Fetching metadata {i}/{len(pending)}: {url}")
+                    info = await self._extract_info_async(self._convert_to_web_url(url))
+                    if not info:
+                        logger.warning(f"Skipping video {video_id} - no metadata available")
+                        continue
 
+                    self.video_metadata[video_id] = self._metadata_from_info(info)
+                    await asyncio.to_thread(self.metadata_cache.put, video_id, self.video_metadata[video_id])
+                    recorded += 1
+
+                    thumbnail_url = info.get('thumbnail')
+                    if thumbnail_url:
+                        suffix = Path(urlparse(thumbnail_url).path).suffix.lower()
+                        if suffix not in ('.jpg', '.jpeg', '.png', '.webp'):
+                            suffix = '.jpg'
+                        success, error_msg = await self._download_body_async(
+                            session, thumbnail_url, info.get('http_headers') or {},
+                            self.output_dir / f"{video_id}{suffix}"
+                        )
+                        if not success:
+                            logger.warning(f"Failed to fetch thumbnail for {video_id}: {error_msg}")
+        finally:
+            await asyncio.to_thread(save_video_metadata, self.video_metadata, self.metadata_file)
+            logger.info(f"Recorded metadata for {recorded} videos")
+
+    def log_session_stats(self) -> None:
+        """Log final statistics for the download session."""
+        stats = self.rate_limiter.get_stats()
+        logger.info("Download session completed. Statistics:")
+        logger.info(f"Successful downloads: {stats['success_count']}")
+        logger.info(f"Failed downloads: {stats['failure_count']}")
+        logger.info(f"Rate limit hits: {stats['rate_limit_hits']}")
+
+    def process_videos(self, data_file: Path, video_type: Literal["liked", "favorite"], limit: int = None,
+                       skip: Optional[Set[str]] = None):
+        """Process videos from the TikTok data export file.
+        
+        Args:
+            data_file: Path to the TikTok data export JSON file
+            video_type: Type of videos to process ("liked" or "favorite")
+            limit: Optional limit on number of videos to process
+            skip: Optional video IDs to leave out without any network request
+        """
+        try:
+            videos_to_download = self.get_pending_videos(data_file, video_type, limit, skip)
             total_new_videos = len(videos_to_download)
             if total_new_videos == 0:
                 logger.info("No new videos to download")
                 return
 
-            logger.info(f"Found {len(video_map)} total videos")
-            logger.info(f"Skipping {len(self.download_history)} already downloaded videos")
-            logger.info(f"Downloading {total_new_videos} new videos")
-
-            # Process only new videos
-            for i, (video_id, video) in enumerate(videos_to_download.items(), 1):
-                try:
-                    url = video[type_config["url_key"]]
-                    logger.info(f"Processing new video {i}/{total_new_videos}: {url}")
-                    
-                    success = self.download_video(url)
-                    if not success:
-                        # If we hit disk space limit, stop processing
-                        if "disk space" in logger.handlers[0].formatter.format(logger.handlers[0].buffer[-1]):
+            # Metadata for the next few videos is fetched while the current one downloads
+            executor = ThreadPoolExecutor(max_workers=METADATA_PREFETCH)
+            prefetched: Deque[Future] = deque(
+                executor.submit(self._get_video_metadata, self._convert_to_web_url(url))
+                for _, url in videos_to_download[:METADATA_PREFETCH]
+            )
+            try:
+                # Process only new videos
+                for i, (video_id, url) in enumerate(videos_to_download, 1):
+                    metadata_future = prefetched.popleft()
+                    try:
+                        self.rate_limiter.wait()
+                        # Keep the prefetch window tied to the download pace
+                        ahead = i - 1 + METADATA_PREFETCH
+                        if ahead < total_new_videos:
+                            prefetched.append(executor.submit(
+                                self._get_video_metadata, self._convert_to_web_url(videos_to_download[ahead][1])
+                            ))
+                        logger.info(f"Processing new video {i}/{total_new_videos}: {url}")
+                        
+                        # If we hit disk space limit, stop processing; other failures move on to the next video
+                        if self.download_video(url, metadata_future) is DownloadResult.DISK_FULL:
                             logger.info("Stopping downloads due to disk space limit")
                             break
-                        # For other failures, continue to next video
-                        continue
-                    
-                    # Use dynamic delay from rate limiter
-                    delay = self.rate_limiter.get_stats()['current_delay']
-                    time.sleep(delay)
-                except Exception as e:
-                    logger.error(f"Error processing video {video_id}: {e}")
-                    continue  # Continue with next video even if this one fails
+                    except Exception as e:
+                        logger.error(f"Error processing video {video_id}: {e}")
+                        continue  # Continue with next video even if this one fails
+            finally:
+                executor.shutdown(cancel_futures=True)
 
-            # Log final statistics
-            stats = self.rate_limiter.get_stats()
-            logger.info("Download session completed. Statistics:")
-            logger.info(f"Successful downloads: {stats['success_count']}")
-            logger.info(f"Failed downloads: {stats['failure_count']}")
-            logger.info(f"Rate limit hits: {stats['rate_limit_hits']}")
+            self.log_session_stats()
 
         except Exception as e:
             logger.error(f"Failed to process {video_type} videos: {e}")
@@ -318,4 +741,10 @@ class TikTokDownloader:
             if 'downloaded_bytes' in d and 'total_bytes' in d:
                 progress = (d['downloaded_bytes'] / d['total_bytes']) * 100
                 if progress % 25 == 0:  # Log at 0%, 25%, 50%, 75%, 100%
-                    logger.info(f"Download progress: {progress:.1f}%") 
\ No newline at end of file
+                    logger.info(f"Download progress: {progress:.1f}%")
+        elif d['status'] == 'finished':
+            try:
+                path = Path(d['filename'])
+                disk_usage.add(path.stat().st_size, path)
+            except (KeyError, OSError):
+                pass 
\ No newline at end of file
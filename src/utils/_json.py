@@ -0,0 +1,62 @@
+"""JSON codec shim preferring orjson, then ujson, then the stdlib json module."""
+
+import dataclasses
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    try:
+        import ujson as _backend
+    except ImportError:
+        import json as _backend
+
+def _default(obj: Any) -> Any:
+    """Serialize dataclasses for backends without native support."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def loads(data: bytes) -> Any:
+    """Parse a JSON document from bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return _backend.loads(data)
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON bytes.
+
+    Dataclass instances are serialized as objects.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    kwargs = {'indent': 2} if indent else {}
+    return _backend.dumps(obj, ensure_ascii=False, default=_default, **kwargs).encode('utf-8')
+
+def load_from(path: Path) -> Any:
+    """Read and parse a JSON file in binary mode."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write bytes to a temporary sibling and rename it over the target.
+
+    An interrupted write never leaves a truncated file behind.
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def dump_to(path: Path, obj: Any, indent: bool = False) -> None:
+    """Serialize an object and atomically write it to a file in binary mode."""
+    write_atomic(path, dumps(obj, indent=indent))
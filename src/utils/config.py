@@ -1,5 +1,9 @@
+import atexit
 import os
+import threading
 from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from . import _json
 
 # Base directories
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -7,16 +11,15 @@ DOWNLOADS_DIR = BASE_DIR / "downloads"
 LOGS_DIR = BASE_DIR / "logs"
 DATA_DIR = BASE_DIR / "data"  # Add data directory for input files
 
-# Create necessary directories
-DOWNLOADS_DIR.mkdir(exist_ok=True)
-LOGS_DIR.mkdir(exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
-
 # Download history file
 DOWNLOAD_HISTORY = LOGS_DIR / "download_history.json"
+HISTORY_LOG = LOGS_DIR / "history.log"  # Append-only IDs downloaded since the last history snapshot
+SNAPSHOT_INTERVAL = 25  # successful downloads between full history/metadata snapshots
 FAILED_DOWNLOADS = LOGS_DIR / "failed_downloads.json"
 DOWNLOAD_PROGRESS = LOGS_DIR / "download_progress.json"
 SPECIAL_CASES = LOGS_DIR / "special_cases.json"  # For slideshows and other non-standard content
+DISK_USAGE_FILE = LOGS_DIR / "usage.json"  # Persisted size of the downloads directory
+SESSION_FLUSH_DELAY = 0.25  # seconds session data changes are batched before being written
 
 # Collection management
 COLLECTIONS_DIR = DOWNLOADS_DIR / "collections"
@@ -24,24 +27,24 @@ UNCATEGORIZED_DIR = DOWNLOADS_DIR / "uncategorized"
 LIKED_VIDEOS_DIR = DOWNLOADS_DIR / "liked_videos"  
 FAVORITE_VIDEOS_DIR = DOWNLOADS_DIR / "favorite_videos" 
 
-# Create collection directories
-COLLECTIONS_DIR.mkdir(exist_ok=True)
-UNCATEGORIZED_DIR.mkdir(exist_ok=True)
-LIKED_VIDEOS_DIR.mkdir(exist_ok=True)  # Create liked videos directory
-FAVORITE_VIDEOS_DIR.mkdir(exist_ok=True)  # Create favorite videos directory
-
 # Video metadata files
 LIKED_VIDEO_METADATA = LOGS_DIR / "liked_video_metadata.json"
 FAVORITE_VIDEO_METADATA = LOGS_DIR / "favorite_video_metadata.json"
+METADATA_CACHE = LOGS_DIR / "meta_cache.sqlite"  # Extracted metadata keyed by video ID
+METADATA_CACHE_TTL = 7 * 24 * 3600  # seconds before cached metadata is refetched
 
 # Input data files
 USER_DATA_FILE = DATA_DIR / "user_data_tiktok.json"  # Default location for TikTok data export
+COLLECTIONS_DATA = DATA_DIR / "collection_videos.json"  # Metadata parsed from collection pages
 
 # Default video format
 VIDEO_FORMAT = "mp4"
 
 # Rate limiting
-MAX_CONCURRENT_DOWNLOADS = 1
+MAX_CONCURRENT_DOWNLOADS = 4  # concurrent download workers in the async pipeline
+MAX_CONNECTIONS_PER_HOST = 4  # aiohttp connection cap per host
+METADATA_PREFETCH = 3  # videos ahead whose metadata the synchronous loop fetches in the background
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # bytes read per chunk when streaming a video body
 INITIAL_DELAY = 4  
 MIN_DELAY = 2  
 MAX_DELAY = 30  # maximum delay allowed
@@ -51,6 +54,7 @@ RATE_LIMIT_WINDOW = 300  # 5 minutes in seconds
 MAX_FAILURES_BEFORE_BACKOFF = 3
 SUCCESS_STREAK_THRESHOLD = 3  # Reduced from 5 since downloads are working well
 TARGET_HOURLY_RATE = 80  # target number of videos per hour
+RATE_LIMIT_BURST = 8  # downloads allowed back to back before pacing to the target rate
 
 # Additional rate limiting parameters
 WARMUP_PERIOD = 10  # minimum number of downloads before rate optimization
@@ -60,20 +64,165 @@ RATE_CHECK_INTERVAL = 900  # 15 minutes - minimum time before checking rates
 MAX_DOWNLOADS_SIZE = 500 * 1024 * 1024 * 1024  # 500GB in bytes
 FILE_SIZE_TOLERANCE = 0.1  # 10% tolerance for file size verification
 
-def get_directory_size(directory: Path) -> int:
-    """Calculate total size of a directory in bytes."""
+# Directories already created by ensure_dir in this process
+_ENSURED_DIRS: Set[Path] = set()
+
+def ensure_dir(path: Path) -> Path:
+    """Create a directory and its parents, at most once per process."""
+    if path not in _ENSURED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+    return path
+
+def ensure_dirs() -> None:
+    """Create the download, log and data directories.
+    
+    Called by entry points instead of at import time, so importing the config
+    touches the filesystem only when something is about to be written.
+    """
+    for path in (DOWNLOADS_DIR, LOGS_DIR, DATA_DIR, COLLECTIONS_DIR,
+                 UNCATEGORIZED_DIR, LIKED_VIDEOS_DIR, FAVORITE_VIDEOS_DIR):
+        ensure_dir(path)
+
+def _scan_directory(directory: Path, sizes: bool = True) -> Tuple[int, Dict[str, int]]:
+    """Walk a directory tree, returning its total file size and the mtime of every directory.
+
+    The walk uses an explicit stack, so deep trees don't hit the recursion limit, and
+    file types come from the directory listing. Directories that vanish or cannot be
+    read mid-walk are skipped. With sizes=False no file is stat-ed and the size is 0.
+    """
     total_size = 0
-    for dirpath, _, filenames in os.walk(directory):
-        for filename in filenames:
-            file_path = Path(dirpath) / filename
-            if not file_path.is_symlink():  # Skip symbolic links
-                total_size += file_path.stat().st_size
-    return total_size
-
-def check_disk_space(file_size: int) -> bool:
-    """Check if adding file_size would exceed MAX_DOWNLOADS_SIZE."""
-    current_size = get_directory_size(DOWNLOADS_DIR)
-    return (current_size + file_size) <= MAX_DOWNLOADS_SIZE
+    mtimes: Dict[str, int] = {}
+    stack = [str(directory)]
+    while stack:
+        path = stack.pop()
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif sizes and entry.is_file(follow_symlinks=False):  # Skip symbolic links
+                        try:
+                            total_size += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            pass
+        except OSError:
+            continue
+    return total_size, mtimes
+
+class DiskUsageTracker:
+    """Running byte count of a directory tree.
+
+    The total is computed once and then kept current with add()/remove() as files
+    are written. It is persisted on exit together with the directory mtimes it is
+    valid for, and the next process reuses it when no directory has changed since,
+    so only the directories need listing instead of every file being stat-ed.
+    Updates may come from several threads and are serialized by a lock.
+
+    Files added or removed by other programs while no tracker is running are noticed
+    at the next load. Changes made during a run are not: a tracked write to the same
+    directory refreshes its stored mtime, so they stay uncounted until a full rescan
+    (delete the state file to force one). In-place rewrites that leave the directory
+    mtime alone are never noticed.
+    """
+
+    def __init__(self, directory: Path, state_file: Path):
+        self.directory = directory
+        self.state_file = state_file
+        self._total: Optional[int] = None
+        self._reserved = 0  # bytes set aside for downloads still in flight
+        self._mtimes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> int:
+        """Load the persisted total, rescanning if the tree changed since it was saved."""
+        atexit.register(self.save)
+        _, self._mtimes = _scan_directory(self.directory, sizes=False)
+        try:
+            state = _json.load_from(self.state_file)
+            if state['mtimes'] == self._mtimes:
+                return state['total']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        total, self._mtimes = _scan_directory(self.directory)
+        return total
+
+    def _current(self) -> int:
+        """Get the total, loading it on first use. The lock must be held."""
+        if self._total is None:
+            self._total = self._load()
+        return self._total
+
+    @property
+    def total(self) -> int:
+        """Current size of the directory tree in bytes."""
+        with self._lock:
+            return self._current()
+
+    def _touch(self, path: Path) -> None:
+        """Record the mtime of a file's directory after a tracked change. The lock must be held."""
+        try:
+            self._mtimes[str(path.parent)] = os.stat(path.parent).st_mtime_ns
+        except OSError:
+            pass
+
+    def add(self, size: int, path: Path) -> None:
+        """Account for a file of the given size written under the directory."""
+        with self._lock:
+            self._total = self._current() + size
+            self._touch(path)
+
+    def remove(self, size: int, path: Path) -> None:
+        """Account for a file of the given size removed from the directory."""
+        with self._lock:
+            self._total = max(self._current() - size, 0)
+            self._touch(path)
+
+    def reserve(self, size: int, limit: int) -> bool:
+        """Set aside size bytes for a download if the tree would stay within limit.
+
+        Concurrent downloads each reserve their expected size before starting, so they
+        cannot all pass the limit check against the same total.
+        """
+        with self._lock:
+            if self._current() + self._reserved + size > limit:
+                return False
+            self._reserved += size
+            return True
+
+    def release(self, size: int) -> None:
+        """Give back a reservation once its download has landed or failed."""
+        with self._lock:
+            self._reserved = max(self._reserved - size, 0)
+
+    def save(self) -> None:
+        """Persist the total and the directory mtimes it is valid for.
+
+        Directories changed since the last tracked write keep their old mtime here,
+        so the next process notices the mismatch and rescans.
+        """
+        with self._lock:
+            if self._total is None:
+                return
+            state = {'total': self._total, 'mtimes': dict(self._mtimes)}
+        try:
+            _json.dump_to(self.state_file, state)
+        except OSError:
+            pass
+
+disk_usage = DiskUsageTracker(DOWNLOADS_DIR, DISK_USAGE_FILE)
+
+def reserve_disk_space(file_size: int) -> bool:
+    """Reserve file_size bytes for a download unless that would exceed MAX_DOWNLOADS_SIZE.
+
+    Every successful reservation must be given back with release_disk_space().
+    """
+    return disk_usage.reserve(file_size, MAX_DOWNLOADS_SIZE)
+
+def release_disk_space(file_size: int) -> None:
+    """Release a reservation made by reserve_disk_space()."""
+    disk_usage.release(file_size)
 
 def format_size(size_bytes: int) -> str:
     """Format bytes into human readable string."""
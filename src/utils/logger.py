@@ -1,9 +1,12 @@
-import json
+import gzip
 import logging
+import os
 from pathlib import Path
 from typing import Dict, Any
+from . import _json
 from .config import (
     DOWNLOAD_HISTORY, 
+    HISTORY_LOG,
     LIKED_VIDEO_METADATA
 )
 
@@ -35,31 +38,81 @@ class YTDLLogger:
         logger.error(msg)
 
 def load_download_history() -> set:
-    """Load the download history from JSON file."""
+    """Load the download history from the JSON snapshot and the append log."""
+    history = set()
     if DOWNLOAD_HISTORY.exists():
-        with open(DOWNLOAD_HISTORY, 'r', encoding='utf-8') as f:
-            return set(json.load(f))
-    return set()
+        history.update(_json.load_from(DOWNLOAD_HISTORY))
+    if HISTORY_LOG.exists():
+        with open(HISTORY_LOG, 'r', encoding='utf-8') as f:
+            history.update(line.strip() for line in f if line.strip())
+    return history
+
+def append_download_history(video_id: str) -> None:
+    """Append a downloaded video ID to the history log."""
+    with open(HISTORY_LOG, 'a', encoding='utf-8') as f:
+        f.write(f"{video_id}\n")
 
 def save_download_history(history: set) -> None:
-    """Save the download history to JSON file."""
-    with open(DOWNLOAD_HISTORY, 'w', encoding='utf-8') as f:
-        json.dump(list(history), f)
+    """Save a full snapshot of the download history and clear the append log."""
+    _json.dump_to(DOWNLOAD_HISTORY, list(history))
+    HISTORY_LOG.unlink(missing_ok=True)
+
+def _metadata_log(metadata_file: Path) -> Path:
+    """Get the JSONL append log that sits next to a metadata file."""
+    return metadata_file.with_suffix('.jsonl')
+
+def _metadata_snapshot(metadata_file: Path) -> Path:
+    """Get the gzipped JSONL snapshot that replaces a metadata file."""
+    return metadata_file.with_suffix('.jsonl.gz')
+
+def _read_metadata_lines(f, metadata: Dict[str, Any]) -> None:
+    """Merge {video_id: metadata} JSONL records into metadata, later lines winning."""
+    for line in f:
+        try:
+            metadata.update(_json.loads(line))
+        except ValueError:
+            # Torn final line from an interrupted append
+            continue
 
 def load_video_metadata(metadata_file: Path) -> Dict[str, Any]:
-    """Load video metadata from JSON file."""
+    """Load video metadata from the gzipped snapshot and its JSONL append log.
+    
+    A plain JSON metadata file written by older versions is read first if present.
+    """
+    metadata = {}
     try:
         if metadata_file.exists():
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            metadata = _json.load_from(metadata_file)
+        snapshot = _metadata_snapshot(metadata_file)
+        if snapshot.exists():
+            with gzip.open(snapshot, 'rb') as f:
+                _read_metadata_lines(f, metadata)
+        log_file = _metadata_log(metadata_file)
+        if log_file.exists():
+            with open(log_file, 'rb') as f:
+                _read_metadata_lines(f, metadata)
     except Exception as e:
         logger.error(f"Failed to load video metadata from {metadata_file}: {e}")
-    return {}
+    return metadata
+
+def append_video_metadata(video_id: str, video_metadata: Dict[str, Any], metadata_file: Path) -> None:
+    """Append one video's metadata as a compact JSONL record next to the metadata file."""
+    try:
+        with open(_metadata_log(metadata_file), 'ab') as f:
+            f.write(_json.dumps({video_id: video_metadata}) + b"\n")
+    except Exception as e:
+        logger.error(f"Failed to append video metadata to {metadata_file}: {e}")
 
 def save_video_metadata(metadata: Dict[str, Any], metadata_file: Path) -> None:
-    """Save video metadata to JSON file."""
+    """Compact video metadata into a gzipped JSONL snapshot and clear the append log."""
     try:
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        # Written to a temporary sibling and renamed into place, so a crash keeps the old snapshot
+        snapshot = _metadata_snapshot(metadata_file)
+        tmp_path = snapshot.with_name(snapshot.name + '.tmp')
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.writelines(_json.dumps({video_id: record}) + b"\n" for video_id, record in metadata.items())
+        os.replace(tmp_path, snapshot)
+        _metadata_log(metadata_file).unlink(missing_ok=True)
+        metadata_file.unlink(missing_ok=True)  # superseded plain JSON snapshot
     except Exception as e:
         logger.error(f"Failed to save video metadata to {metadata_file}: {e}") 
\ No newline at end of file
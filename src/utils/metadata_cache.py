@@ -0,0 +1,60 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from . import _json
+from .config import METADATA_CACHE, METADATA_CACHE_TTL
+
+class MetadataCache:
+    """SQLite-backed cache of extracted video metadata keyed by video ID.
+
+    Entries older than the TTL are treated as misses, so stale metadata is
+    refetched from yt-dlp and overwritten.
+    """
+
+    def __init__(self, path: Path = METADATA_CACHE, ttl: int = METADATA_CACHE_TTL):
+        """Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds before a cached entry expires
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Autocommit mode; downloads may look up metadata from worker threads
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta(vid TEXT PRIMARY KEY, json TEXT, ts INTEGER)")
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Get cached metadata for a video, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT json FROM meta WHERE vid = ? AND ts > ?",
+                (video_id, int(time.time()) - self.ttl)
+            ).fetchone()
+        return _json.loads(row[0]) if row else None
+
+    def put(self, video_id: str, metadata: Dict[str, Any]) -> None:
+        """Store metadata for a video, replacing any existing entry."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta(vid, json, ts) VALUES (?, ?, ?)",
+                (video_id, _json.dumps(metadata).decode('utf-8'), int(time.time()))
+            )
+
+    def refresh_ids(self, video_ids: Iterable[str]) -> None:
+        """Drop cached entries so the given videos are fetched again."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM meta WHERE vid = ?", ((vid,) for vid in video_ids))
+
+    def nuke(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM meta")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
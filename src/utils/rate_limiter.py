@@ -1,61 +1,73 @@
+import asyncio
+import re
 import time
-from typing import List, Dict, Any
+from collections import deque
+from typing import Deque, Dict, Any, Mapping
 from .logger import logger
 from .config import (
     INITIAL_DELAY,
-    MIN_DELAY,
     MAX_DELAY,
     RATE_LIMIT_WINDOW,
+    RATE_LIMIT_BURST,
     MAX_FAILURES_BEFORE_BACKOFF,
-    SUCCESS_STREAK_THRESHOLD,
-    TARGET_HOURLY_RATE
+    TARGET_HOURLY_RATE,
+    WARMUP_PERIOD
 )
 
+# Errors suggesting rate limiting
+_RATE_LIMIT_RE = re.compile(r'too many requests|429|rate limit|blocked|timeout', re.IGNORECASE)
+# Errors caused by the content itself (not a rate limit issue), e.g. slideshows
+CONTENT_ERROR_RE = re.compile(r'NoneType|unsupported operand|slideshow|index out of range')
+
 class RateLimitHandler:
     def __init__(self):
-        self.failures: List[float] = []  # timestamps of failures
-        self.current_delay = INITIAL_DELAY
+        self.failures: Deque[float] = deque()  # timestamps of failures, oldest first
         self.consecutive_failures = 0
         self.consecutive_successes = 0
-        self.hourly_downloads: List[float] = []  # timestamps of successful downloads
+        self.started = time.monotonic()
+        # Grants download permits at the target hourly rate, with a small burst
+        self.bucket = TokenBucket(rate=TARGET_HOURLY_RATE / 3600, capacity=RATE_LIMIT_BURST)
         self.session_stats: Dict[str, int] = {
             'success_count': 0,
             'failure_count': 0,
             'rate_limit_hits': 0
         }
     
+    async def acquire(self) -> None:
+        """Wait for a download permit."""
+        await self.bucket.acquire()
+    
+    def wait(self) -> None:
+        """Block until a download permit is available."""
+        self.bucket.acquire_blocking()
+    
     def _get_hourly_rate(self) -> int:
-        """Calculate downloads in the last hour."""
-        now = time.time()
-        hour_ago = now - 3600
-        self.hourly_downloads = [t for t in self.hourly_downloads if t > hour_ago]
-        
+        """Calculate the session's download rate per hour."""
         # Don't report rate warnings until we have enough samples
-        if len(self.hourly_downloads) < 5:
+        if self.session_stats['success_count'] < 5:
             return TARGET_HOURLY_RATE  # Pretend we're on target during warmup
-            
-        # If we've been running less than 15 minutes, scale up the rate
-        if (now - min(self.hourly_downloads)) < 900:  # 15 minutes
-            current_rate = len(self.hourly_downloads)
-            # Extrapolate the rate to hourly
-            return int(current_rate * (3600 / (now - min(self.hourly_downloads))))
-            
-        return len(self.hourly_downloads)
+        elapsed = time.monotonic() - self.started
+        return int(self.session_stats['success_count'] * 3600 / elapsed)
+    
+    def _backoff(self) -> float:
+        """Get the pause length for the current failure streak."""
+        return min(INITIAL_DELAY * 2 ** (self.consecutive_failures - 1), MAX_DELAY)
     
-    def update(self, success: bool, error_message: str = '') -> float:
-        """Update rate limiter state and get next delay time.
+    def update(self, success: bool, error_message: str = '') -> None:
+        """Update rate limiter state after a request.
+        
+        Rate-limit errors and sustained failures pause the token bucket; pacing
+        between downloads is otherwise left to the bucket.
         
         Args:
             success: Whether the last request was successful
             error_message: Error message if request failed
-            
-        Returns:
-            float: Number of seconds to wait before next request
         """
         now = time.time()
         
-        # Clean up old failures outside the window
-        self.failures = [f for f in self.failures if now - f < RATE_LIMIT_WINDOW]
+        # Clean up old failures outside the window; timestamps are appended in order
+        while self.failures and now - self.failures[0] >= RATE_LIMIT_WINDOW:
+            self.failures.popleft()
         
         if not success:
             self.failures.append(now)
@@ -63,74 +75,110 @@ class RateLimitHandler:
             self.consecutive_failures += 1
             self.consecutive_successes = 0
             
-            # Check if error suggests rate limiting
-            rate_limit_indicators = [
-                'too many requests',
-                '429',
-                'rate limit',
-                'blocked',
-                'timeout'
-            ]
-            
-            # Check if error is content-related (not a rate limit issue)
-            content_related_errors = [
-                'NoneType',
-                'unsupported operand',
-                'slideshow',
-                'index out of range'
-            ]
-            
-            if any(indicator in error_message.lower() for indicator in rate_limit_indicators):
+            if _RATE_LIMIT_RE.search(error_message):
                 self.session_stats['rate_limit_hits'] += 1
-                # Aggressive backoff for rate limits
-                self.current_delay = min(self.current_delay * 2, MAX_DELAY)
-                logger.warning(f"Rate limit detected. Increasing delay to {self.current_delay}s")
-            elif any(err in error_message for err in content_related_errors):
-                # Don't increase delay for content-related errors
-                logger.info("Content-related error detected. Maintaining current delay.")
+                backoff = self._backoff()
+                self.bucket.pause(backoff)
+                logger.warning(f"Rate limit detected. Pausing downloads for {backoff}s")
+            elif CONTENT_ERROR_RE.search(error_message):
+                # Don't pause for content-related errors
+                logger.info("Content-related error detected. Keeping current rate.")
                 self.consecutive_failures = 0  # Reset failure count since it's not a rate issue
-            else:
-                # Progressive backoff based on consecutive failures
-                multiplier = min(self.consecutive_failures, 3)
-                self.current_delay = min(self.current_delay * (1 + 0.5 * multiplier), MAX_DELAY)
-                logger.warning(f"Failure #{self.consecutive_failures}. Increasing delay to {self.current_delay}s")
+            elif self.consecutive_failures >= MAX_FAILURES_BEFORE_BACKOFF:
+                backoff = self._backoff()
+                self.bucket.pause(backoff)
+                logger.warning(f"Failure #{self.consecutive_failures}. Pausing downloads for {backoff}s")
         else:
             self.session_stats['success_count'] += 1
             self.consecutive_successes += 1
             self.consecutive_failures = 0
-            self.hourly_downloads.append(now)
-            
-            hourly_rate = self._get_hourly_rate()
             
-            # Only adjust rates if we have enough data
-            if len(self.hourly_downloads) >= 5:
-                # If we're ahead of schedule, be more conservative
-                if hourly_rate > TARGET_HOURLY_RATE:
-                    reduction_factor = 0.05  # 5% reduction
-                else:
-                    # More aggressive reduction if we're behind schedule
-                    reduction_factor = 0.15 if self.consecutive_successes >= SUCCESS_STREAK_THRESHOLD else 0.05
-                
-                # Reduce delay if we're having sustained success
-                if self.consecutive_successes >= SUCCESS_STREAK_THRESHOLD:
-                    self.current_delay = max(
-                        MIN_DELAY,
-                        self.current_delay * (1 - reduction_factor)
-                    )
-                    logger.info(f"Success streak: {self.consecutive_successes}. Reducing delay to {self.current_delay}s")
-                
+            # Only check rates once we have enough data
+            if self.session_stats['success_count'] >= WARMUP_PERIOD:
+                hourly_rate = self._get_hourly_rate()
                 if hourly_rate < TARGET_HOURLY_RATE * 0.8:  # More than 20% behind schedule
-                    logger.warning(f"Behind target rate ({hourly_rate}/{TARGET_HOURLY_RATE} downloads/hour). Adjusting strategy.")
-        
-        return self.current_delay
+                    logger.warning(f"Behind target rate ({hourly_rate}/{TARGET_HOURLY_RATE} downloads/hour).")
     
     def get_stats(self) -> Dict[str, Any]:
         """Get current session statistics."""
         return {
             **self.session_stats,
-            'current_delay': self.current_delay,
             'recent_failures': len(self.failures),
             'consecutive_successes': self.consecutive_successes,
             'consecutive_failures': self.consecutive_failures,
             'hourly_rate': self._get_hourly_rate()
-        } 
\ No newline at end of file
+        }
+
+class TokenBucket:
+    """Async token bucket pacing requests to a single host.
+
+    Honors ``X-RateLimit-Remaining``/``X-RateLimit-Reset`` response headers by
+    pausing the bucket until the advertised reset time.
+    """
+    def __init__(self, rate: float, capacity: int):
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Add tokens accrued since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self) -> float:
+        """Consume a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds to wait before retrying
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while (delay := self._take()) > 0:
+                await asyncio.sleep(delay)
+
+    def acquire_blocking(self) -> None:
+        """Block the calling thread until a token is available and consume it."""
+        while (delay := self._take()) > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Stop granting tokens for the given number of seconds."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Pause the bucket when the server reports an exhausted quota."""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) > 0:
+                return
+            reset_at = float(reset)
+        except ValueError:
+            return
+
+        # Servers send either an epoch timestamp or a number of seconds
+        delay = reset_at - time.time() if reset_at > 1_000_000_000 else reset_at
+        if delay > 0:
+            logger.warning(f"Rate limit quota exhausted. Pausing requests for {delay:.1f}s")
+            self.pause(delay)
@@ -1,49 +1,136 @@
-import json
+import atexit
+import copy
+import os
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+from . import _json
 from .logger import logger
-from .config import LOGS_DIR
+from .config import LOGS_DIR, SESSION_FLUSH_DELAY
+
+# User agents cycled through by rotate_user_agent
+_USER_AGENTS = (
+    # Windows Chrome
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    # Windows Firefox
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    # Windows Edge
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+    # Mobile Chrome
+    'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36'
+)
+_NEXT_UA = {ua: _USER_AGENTS[(i + 1) % len(_USER_AGENTS)] for i, ua in enumerate(_USER_AGENTS)}
+
+# Response headers worth keeping in the session (lowercase)
+_USEFUL_HEADERS = frozenset(('x-ratelimit-remaining', 'x-ratelimit-reset'))
+
+# Session used when no saved session data can be loaded
+_DEFAULT_SESSION: Dict[str, Any] = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+        'TE': 'trailers'
+    },
+    'cookies': {}
+}
 
 class SessionManager:
     def __init__(self):
         self.cookies_file = LOGS_DIR / 'cookies.txt'
         self.session_file = LOGS_DIR / 'session_data.json'
+        # String form for os.stat and yt-dlp's cookiefile option
+        self._cookies_path = str(self.cookies_file)
         self.session_data: Dict[str, Any] = self._load_session_data()
+        # Built yt-dlp options, valid while the session and cookie file are unchanged
+        self._options_cache: Optional[Mapping[str, Any]] = None
+        self._cookies_mtime: Optional[float] = None
+        
+        # Changes are written by a background thread, coalescing bursts into one write
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()  # session data changed since the last write
+        self._stop = threading.Event()
+        self._wake = threading.Condition()  # notified on changes and on close
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="session-flush", daemon=True)
+        self._flush_thread.start()
+        atexit.register(self._flush)
         
     def _load_session_data(self) -> Dict[str, Any]:
         """Load session data from file."""
-        if self.session_file.exists():
-            try:
-                with open(self.session_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load session data: {e}")
-        return {
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'headers': {
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'TE': 'trailers'
-            },
-            'cookies': {}
-        }
+        try:
+            # One read instead of an exists() check followed by a read
+            data = self.session_file.read_bytes()
+            if data:
+                return _json.loads(data)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load session data: {e}")
+        # Deep copy: update_session mutates the nested headers and cookies dicts
+        return copy.deepcopy(_DEFAULT_SESSION)
     
     def _save_session_data(self):
         """Save session data to file."""
         try:
-            with open(self.session_file, 'w', encoding='utf-8') as f:
-                json.dump(self.session_data, f, indent=2)
+            with self._lock:
+                data = _json.dumps(self.session_data, indent=True)
+            # Atomic replace, so a crash mid-write can't fall back to the default session
+            _json.write_atomic(self.session_file, data)
         except Exception as e:
             logger.error(f"Failed to save session data: {e}")
     
-    def get_yt_dlp_options(self) -> Dict[str, Any]:
-        """Get yt-dlp options with session data."""
+    def _flush(self):
+        """Write session data now if it changed since the last write."""
+        if self._dirty.is_set():
+            self._dirty.clear()
+            self._save_session_data()
+    
+    def _mark_dirty(self):
+        """Flag the session data as changed and wake the flush thread."""
+        self._dirty.set()
+        with self._wake:
+            self._wake.notify()
+    
+    def _flush_loop(self):
+        """Write pending session changes at most once per SESSION_FLUSH_DELAY."""
+        while True:
+            with self._wake:
+                self._wake.wait_for(lambda: self._dirty.is_set() or self._stop.is_set())
+            if self._stop.wait(SESSION_FLUSH_DELAY):
+                return  # close() writes whatever is still pending
+            self._flush()
+    
+    def close(self):
+        """Stop the flush thread and write any pending changes."""
+        self._stop.set()
+        with self._wake:
+            self._wake.notify()
+        self._flush_thread.join()
+        # The thread and the atexit hook no longer keep this instance alive
+        atexit.unregister(self._flush)
+        self._flush()
+    
+    def get_yt_dlp_options(self) -> Mapping[str, Any]:
+        """Get yt-dlp options with session data.
+        
+        The options are cached until the session changes or the cookie file is
+        created, removed or modified. The returned mapping is a read-only view of
+        the cached options; use get_yt_dlp_options_mutable() for a copy to edit.
+        """
+        try:
+            cookies_mtime = os.stat(self._cookies_path).st_mtime
+        except OSError:
+            cookies_mtime = None
+        if self._options_cache is not None and cookies_mtime == self._cookies_mtime:
+            return self._options_cache
+
         options = {
             'user_agent': self.session_data['user_agent'],
             'headers': self.session_data['headers'],
@@ -60,52 +147,56 @@ class SessionManager:
         }
 
         # Only try to use cookies if the file exists
-        if self.cookies_file.exists():
+        if cookies_mtime is not None:
             options.update({
-                'cookiefile': str(self.cookies_file),
+                'cookiefile': self._cookies_path,
                 'cookiesfrombrowser': None  # Disable browser cookies to avoid permission issues
             })
         
-        return options
+        self._options_cache = MappingProxyType(options)
+        self._cookies_mtime = cookies_mtime
+        return self._options_cache
+    
+    def get_yt_dlp_options_mutable(self) -> Dict[str, Any]:
+        """Get a copy of the yt-dlp options that the caller may modify."""
+        return dict(self.get_yt_dlp_options())
     
     def update_session(self, response_headers: Optional[Dict[str, str]] = None):
         """Update session data from response headers."""
         if response_headers:
-            # Update any relevant headers or cookies
-            if 'set-cookie' in response_headers:
-                self.session_data['cookies'].update(self._parse_cookies(response_headers['set-cookie']))
+            # Header names are case-insensitive; normalize them once
+            response_headers = {name.lower(): value for name, value in response_headers.items()}
+            changed = False
+            with self._lock:
+                # Update any relevant headers or cookies
+                if 'set-cookie' in response_headers:
+                    cookies = self.session_data['cookies']
+                    for name, value in self._parse_cookies(response_headers['set-cookie']).items():
+                        if cookies.get(name) != value:
+                            cookies[name] = value
+                            changed = True
+                
+                # Store other useful headers
+                headers = self.session_data['headers']
+                for header in _USEFUL_HEADERS & response_headers.keys():
+                    if headers.get(header) != response_headers[header]:
+                        headers[header] = response_headers[header]
+                        changed = True
             
-            # Store other useful headers
-            useful_headers = ['x-ratelimit-remaining', 'x-ratelimit-reset']
-            for header in useful_headers:
-                if header in response_headers:
-                    self.session_data['headers'][header] = response_headers[header]
-            
-            self._save_session_data()
+            # Responses often repeat the stored values; only save real changes
+            if changed:
+                self._mark_dirty()
+                self._options_cache = None
     
     def _parse_cookies(self, cookie_header: str) -> Dict[str, str]:
         """Parse cookie header into dictionary."""
-        cookies = {}
-        for cookie in cookie_header.split(';'):
-            if '=' in cookie:
-                name, value = cookie.strip().split('=', 1)
-                cookies[name] = value
-        return cookies
+        # partition gives (name, '=', value); [::2] drops the separator
+        return dict(cookie.strip().partition('=')[::2] for cookie in cookie_header.split(';') if '=' in cookie)
     
     def rotate_user_agent(self):
         """Rotate user agent to avoid detection."""
-        user_agents = [
-            # Windows Chrome
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            # Windows Firefox
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-            # Windows Edge
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
-            # Mobile Chrome
-            'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36'
-        ]
-        current_index = user_agents.index(self.session_data['user_agent']) if self.session_data['user_agent'] in user_agents else -1
-        next_index = (current_index + 1) % len(user_agents)
-        self.session_data['user_agent'] = user_agents[next_index]
+        # Unknown agents (e.g. the initial default) start the cycle from the beginning
+        self.session_data['user_agent'] = _NEXT_UA.get(self.session_data['user_agent'], _USER_AGENTS[0])
         logger.info(f"Rotated user agent to: {self.session_data['user_agent']}")
-        self._save_session_data() 
\ No newline at end of file
+        self._mark_dirty()
+        self._options_cache = None 
\ No newline at end of file